@@ -1,69 +1,129 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 import sqlite3
+import threading
 from pathlib import Path
+from typing import Iterator
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 STORE_DIR = BASE_DIR / "storage"
 DB_PATH = STORE_DIR / "app.db"
 
+CONNECTION_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+"""
+
+# Bump when the schema or migrations in _migrate() change.
+SCHEMA_VERSION = 1
+
+SCHEMA_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        title TEXT NOT NULL,
+        course TEXT,
+        description TEXT,
+        task_type TEXT,
+        due_date TEXT,
+        estimated_minutes INTEGER,
+        importance INTEGER,
+        status TEXT DEFAULT 'pending',
+        created_at TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS syllabi (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        file_name TEXT NOT NULL,
+        course TEXT,
+        created_at TEXT,
+        calendar_json TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS syllabus_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        syllabus_id TEXT NOT NULL,
+        event_uid TEXT NOT NULL,
+        title TEXT NOT NULL,
+        event_date TEXT NOT NULL,
+        event_type TEXT,
+        confidence REAL,
+        source_page INTEGER,
+        source_line TEXT,
+        FOREIGN KEY (syllabus_id) REFERENCES syllabi(id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_syllabus_events_syllabus ON syllabus_events(syllabus_id)"
+)
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_DB_INITIALIZED = threading.Event()
+
 
 def get_connection() -> sqlite3.Connection:
+    connection = getattr(_local, "connection", None)
+    if connection is not None:
+        return connection
+
     STORE_DIR.mkdir(parents=True, exist_ok=True)
-    connection = sqlite3.connect(DB_PATH)
+    connection = sqlite3.connect(DB_PATH, isolation_level=None)
     connection.row_factory = sqlite3.Row
+    connection.executescript(CONNECTION_PRAGMAS)
+    _local.connection = connection
     return connection
 
 
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    connection = get_connection()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+        connection.execute("COMMIT")
+    except BaseException:
+        # A failed COMMIT can leave the transaction open on this thread's
+        # cached connection; SQLite may also have rolled back already.
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+
+
 def init_db() -> None:
-    STORE_DIR.mkdir(parents=True, exist_ok=True)
-    with get_connection() as connection:
-        connection.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                title TEXT NOT NULL,
-                course TEXT,
-                description TEXT,
-                task_type TEXT,
-                due_date TEXT,
-                estimated_minutes INTEGER,
-                importance INTEGER,
-                status TEXT DEFAULT 'pending',
-                created_at TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS syllabi (
-                id TEXT PRIMARY KEY,
-                user_id TEXT,
-                file_name TEXT NOT NULL,
-                course TEXT,
-                created_at TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS syllabus_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                syllabus_id TEXT NOT NULL,
-                event_uid TEXT NOT NULL,
-                title TEXT NOT NULL,
-                event_date TEXT NOT NULL,
-                event_type TEXT,
-                confidence REAL,
-                source_page INTEGER,
-                source_line TEXT,
-                FOREIGN KEY (syllabus_id) REFERENCES syllabi(id)
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
-            CREATE INDEX IF NOT EXISTS idx_syllabus_events_syllabus ON syllabus_events(syllabus_id);
-            """
-        )
+    if _DB_INITIALIZED.is_set():
+        return
+
+    with _init_lock:
+        if _DB_INITIALIZED.is_set():
+            return
+        _migrate()
+        _DB_INITIALIZED.set()
+
+
+def _migrate() -> None:
+    # The version is read under BEGIN IMMEDIATE so concurrent workers
+    # starting together cannot both run the migration.
+    with transaction() as connection:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        for statement in SCHEMA_STATEMENTS:
+            connection.execute(statement)
 
         _ensure_column(connection, "tasks", "user_id", "TEXT")
         _ensure_column(connection, "tasks", "description", "TEXT")
         _ensure_column(connection, "tasks", "task_type", "TEXT")
         _ensure_column(connection, "syllabi", "user_id", "TEXT")
+        _ensure_column(connection, "syllabi", "calendar_json", "TEXT")
 
         connection.execute("UPDATE tasks SET user_id = 'local' WHERE user_id IS NULL")
         connection.execute("UPDATE syllabi SET user_id = 'local' WHERE user_id IS NULL")
@@ -74,6 +134,7 @@ def init_db() -> None:
         connection.execute(
             "CREATE INDEX IF NOT EXISTS idx_syllabi_user ON syllabi(user_id)"
         )
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 
 def _ensure_column(connection: sqlite3.Connection, table: str, column: str, column_type: str) -> None:
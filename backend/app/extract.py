@@ -1,27 +1,49 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime
-from io import BytesIO
+from functools import lru_cache
 import os
+from pathlib import Path
 import re
+import threading
 from typing import Iterable, Optional
 
-import dateparser
-import pdfplumber
+from dateparser.date import DateDataParser
+import pypdfium2 as pdfium
 import requests
 from PyPDF2 import PdfReader
 
+try:
+    import hyperscan
+except ImportError:  # no wheel for some platforms, e.g. Linux aarch64
+    hyperscan = None
+
 MONTH_PATTERN = (
     r"(?:jan|january|feb|february|mar|march|apr|april|may|jun|june|jul|july|aug|august|"
     r"sep|sept|september|oct|october|nov|november|dec|december)"
 )
 
-DATE_REGEXES = [
-    re.compile(rf"\b{MONTH_PATTERN}\s+\d{{1,2}}(?:,\s*\d{{4}})?\b", re.IGNORECASE),
-    re.compile(r"\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"),
-    re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
-]
+# The day must not run into a slash date ("Dec 12/15/2025"); otherwise the
+# month alternative claims "Dec 12" and the full slash date is never matched.
+MONTH_DATE_PATTERN = rf"\b{MONTH_PATTERN}\s+\d{{1,2}}(?!/)(?:,\s*\d{{4}})?\b"
+SLASH_DATE_PATTERN = r"\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"
+ISO_DATE_PATTERN = r"\b\d{4}-\d{2}-\d{2}\b"
+
+DATE_PATTERNS = [MONTH_DATE_PATTERN, SLASH_DATE_PATTERN, ISO_DATE_PATTERN]
+
+DATE_RE = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in DATE_PATTERNS),
+    re.IGNORECASE
+)
+
+_WS_RE = re.compile(r"\s{2,}")
+_HAS_DIGIT = re.compile(r"\d")
+_YEAR_RE = re.compile(r"\d{4}")
+_DEADLINE_RE = re.compile(r"due|deadline|exam|quiz", re.IGNORECASE)
+
+_DATEPARSER_SETTINGS = {"PREFER_DATES_FROM": "future", "STRICT_PARSING": True}
 
 TYPE_KEYWORDS = {
     "exam": ["exam", "midterm", "final"],
@@ -32,12 +54,48 @@ TYPE_KEYWORDS = {
     "lab": ["lab", "laboratory"]
 }
 
+
+# Keyword expression ids follow the date patterns, in TYPE_KEYWORDS order, so
+# a lower id is a higher-priority type.
+KEYWORD_IDS = [
+    (item_type, keyword)
+    for item_type, keywords in TYPE_KEYWORDS.items()
+    for keyword in keywords
+]
+
+
+def _build_scan_database() -> hyperscan.Database:
+    # Hyperscan rejects lookahead, so the month pattern is compiled without it
+    # and _scan_page drops month spans whose day runs into a "/".
+    expressions = [pattern.replace("(?!/)", "").encode() for pattern in DATE_PATTERNS]
+    expressions += [re.escape(keyword).encode() for _, keyword in KEYWORD_IDS]
+    flags = [hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(DATE_PATTERNS)
+    flags += [hyperscan.HS_FLAG_CASELESS] * len(KEYWORD_IDS)
+
+    database = hyperscan.Database()
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=flags
+    )
+    return database
+
+
+SCAN_DATABASE = _build_scan_database() if hyperscan is not None else None
+_scan_local = threading.local()
+# PDFium is not thread-safe, so documents are opened and read one at a time.
+_PDFIUM_LOCK = threading.Lock()
+
 OCR_SPACE_API_URL = "https://api.ocr.space/parse/image"
 OCR_SPACE_API_KEY = os.getenv("OCR_SPACE_API_KEY", "helloworld")
 OCR_SPACE_TIMEOUT = 20
 
+# Shared so repeated OCR fallbacks reuse keep-alive connections to OCR.Space.
+_OCR_SESSION = requests.Session()
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedEvent:
     id: str
     title: str
@@ -46,15 +104,35 @@ class ExtractedEvent:
     confidence: float
     source_page: Optional[int]
     source_line: Optional[str]
+    _dict: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "_dict",
+            {
+                "id": self.id,
+                "title": self.title,
+                "date": self.date,
+                "type": self.type,
+                "confidence": self.confidence,
+                "source_page": self.source_page,
+                "source_line": self.source_line
+            }
+        )
 
+    @property
+    def as_dict(self) -> dict:
+        return self._dict
 
-def extract_events_from_pdf_bytes(pdf_bytes: bytes) -> list[ExtractedEvent]:
-    pages = _extract_text_pages(pdf_bytes)
+
+def extract_events_from_pdf(pdf_path: Path) -> list[ExtractedEvent]:
+    pages = _extract_text_pages(pdf_path)
     events = _extract_events_from_pages(pages)
     if events:
         return events
 
-    ocr_text = _extract_text_via_ocr_space(pdf_bytes)
+    ocr_text = _extract_text_via_ocr_space(pdf_path)
     if ocr_text:
         events = _extract_events_from_pages([(1, ocr_text)])
     return events
@@ -63,28 +141,25 @@ def extract_events_from_pdf_bytes(pdf_bytes: bytes) -> list[ExtractedEvent]:
 def _extract_events_from_pages(pages: list[tuple[int, str]]) -> list[ExtractedEvent]:
     events: list[ExtractedEvent] = []
     seen: set[tuple[str, str]] = set()
-    now = datetime.utcnow()
+    # Title and date depend only on (line, date_text), so a repeat of a pair
+    # (e.g. a weekly header copied onto every page) can be skipped outright.
+    seen_pairs: set[tuple[str, str]] = set()
+    # Quantized to the day so cached parses stay valid for the whole request.
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
 
     for page_number, page_text in pages:
-        for line in _iter_lines(page_text):
-            date_matches = _find_dates(line)
-            if not date_matches:
-                continue
-
-            item_type, keyword_hits = _classify_type(line)
+        for line, date_matches, item_type, keyword_hits in _scan_page(page_text):
+            line_score = _line_score(line, keyword_hits)
             for date_text in date_matches:
-                parsed = dateparser.parse(
-                    date_text,
-                    settings={
-                        "PREFER_DATES_FROM": "future",
-                        "RELATIVE_BASE": now,
-                        "STRICT_PARSING": True
-                    }
-                )
-                if not parsed:
+                pair = (line, date_text)
+                if pair in seen_pairs:
+                    continue
+                seen_pairs.add(pair)
+
+                date_iso = _parse_date(date_text, now)
+                if not date_iso:
                     continue
 
-                date_iso = parsed.date().isoformat()
                 title = _build_title(line, date_text, item_type)
                 if not title:
                     title = "Untitled syllabus item"
@@ -93,7 +168,7 @@ def _extract_events_from_pages(pages: list[tuple[int, str]]) -> list[ExtractedEv
                 if key in seen:
                     continue
 
-                confidence = _confidence_score(date_text, keyword_hits, line)
+                confidence = _confidence_score(date_text, line_score)
                 event = ExtractedEvent(
                     id=f"evt_{len(events) + 1}",
                     title=title,
@@ -110,22 +185,40 @@ def _extract_events_from_pages(pages: list[tuple[int, str]]) -> list[ExtractedEv
     return events
 
 
-def _extract_text_via_ocr_space(pdf_bytes: bytes) -> str:
+@lru_cache(maxsize=4096)
+def _parse_date(date_text: str, relative_base: datetime) -> Optional[str]:
+    parsed = _date_parser(relative_base).get_date_data(date_text).date_obj
+    if not parsed:
+        return None
+    return parsed.date().isoformat()
+
+
+@lru_cache(maxsize=2)
+def _date_parser(relative_base: datetime) -> DateDataParser:
+    # Pinning the language skips dateparser's per-call language detection.
+    return DateDataParser(
+        languages=["en"],
+        settings={**_DATEPARSER_SETTINGS, "RELATIVE_BASE": relative_base}
+    )
+
+
+def _extract_text_via_ocr_space(pdf_path: Path) -> str:
     if not OCR_SPACE_API_KEY:
         return ""
 
     try:
-        response = requests.post(
-            OCR_SPACE_API_URL,
-            files={"file": ("syllabus.pdf", pdf_bytes, "application/pdf")},
-            data={
-                "apikey": OCR_SPACE_API_KEY,
-                "language": "eng",
-                "isOverlayRequired": "false",
-                "OCREngine": "2"
-            },
-            timeout=OCR_SPACE_TIMEOUT
-        )
+        with open(pdf_path, "rb") as pdf_file:
+            response = _OCR_SESSION.post(
+                OCR_SPACE_API_URL,
+                files={"file": ("syllabus.pdf", pdf_file, "application/pdf")},
+                data={
+                    "apikey": OCR_SPACE_API_KEY,
+                    "language": "eng",
+                    "isOverlayRequired": "false",
+                    "OCREngine": "2"
+                },
+                timeout=OCR_SPACE_TIMEOUT
+            )
         if response.status_code != 200:
             return ""
         payload = response.json()
@@ -136,17 +229,24 @@ def _extract_text_via_ocr_space(pdf_bytes: bytes) -> str:
         return ""
 
 
-def _extract_text_pages(pdf_bytes: bytes) -> list[tuple[int, str]]:
+def _extract_text_pages(pdf_path: Path) -> list[tuple[int, str]]:
     pages: list[tuple[int, str]] = []
-    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
-        for index, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text() or ""
-            pages.append((index, text))
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index, page in enumerate(pdf, start=1):
+                textpage = page.get_textpage()
+                pages.append((index, textpage.get_text_bounded()))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
 
     if any(text for _, text in pages):
         return pages
 
-    reader = PdfReader(BytesIO(pdf_bytes))
+    pages = []
+    reader = PdfReader(pdf_path)
     for index, page in enumerate(reader.pages, start=1):
         text = page.extract_text() or ""
         pages.append((index, text))
@@ -155,47 +255,132 @@ def _extract_text_pages(pdf_bytes: bytes) -> list[tuple[int, str]]:
 
 def _iter_lines(text: str) -> Iterable[str]:
     for raw_line in text.splitlines():
+        # Every date pattern needs a digit, so skip lines that cannot match.
+        if not _HAS_DIGIT.search(raw_line):
+            continue
         line = " ".join(raw_line.split())
         if len(line) < 6:
             continue
         yield line
 
 
-def _find_dates(line: str) -> list[str]:
+def _scan_page(page_text: str) -> Iterable[tuple[str, list[str], str, list[str]]]:
+    """Yield (line, date_texts, item_type, keyword_hits) for lines with dates."""
+    if SCAN_DATABASE is None:
+        for line in _iter_lines(page_text):
+            date_matches = DATE_RE.findall(line)
+            if date_matches:
+                yield (line, date_matches, *_classify_type(line))
+        return
+
+    lines = list(_iter_lines(page_text))
+    if not lines:
+        return
+
+    encoded = [line.encode() for line in lines]
+    starts: list[int] = []
+    offset = 0
+    for data in encoded:
+        starts.append(offset)
+        offset += len(data) + 1
+
+    date_spans: list[list[tuple[int, int]]] = [[] for _ in lines]
+    best_keyword: list[Optional[int]] = [None] * len(lines)
+    date_count = len(DATE_PATTERNS)
+    month_id = DATE_PATTERNS.index(MONTH_DATE_PATTERN)
+    joined = b"\n".join(encoded)
+
+    def on_match(expression_id: int, start: int, end: int, flags: int, context: object) -> None:
+        index = bisect_right(starts, end - 1) - 1
+        if expression_id < date_count:
+            if start < starts[index]:
+                return
+            # Stands in for DATE_RE's (?!/) lookahead, which Hyperscan
+            # rejects: "Dec 12/15/2025" yields only the slash date.
+            if (
+                expression_id == month_id
+                and joined[end:end + 1] == b"/"
+                and b"," not in joined[start:end]
+            ):
+                return
+            date_spans[index].append((start - starts[index], end - starts[index]))
+            return
+        current = best_keyword[index]
+        if current is None or expression_id < current:
+            best_keyword[index] = expression_id
+
+    SCAN_DATABASE.scan(joined, match_event_handler=on_match, scratch=_scan_scratch())
+
+    for line, data, spans, keyword_id in zip(lines, encoded, date_spans, best_keyword):
+        date_matches = _line_dates(line, data, spans)
+        if not date_matches:
+            continue
+        if keyword_id is None:
+            yield line, date_matches, "other", []
+        else:
+            item_type, keyword = KEYWORD_IDS[keyword_id - date_count]
+            yield line, date_matches, item_type, [keyword]
+
+
+def _line_dates(line: str, data: bytes, spans: list[tuple[int, int]]) -> list[str]:
+    # Hyperscan's digit and word-boundary classes only cover ASCII.
+    if not line.isascii():
+        return DATE_RE.findall(line)
+
+    # Hyperscan reports every match end, so keep leftmost-longest spans.
     matches: list[str] = []
-    for pattern in DATE_REGEXES:
-        matches.extend(pattern.findall(line))
+    last_start = last_end = -1
+    for start, end in sorted(spans, key=lambda span: (span[0], -span[1])):
+        if start < last_end:
+            # An overlap can hide a later start for the same end.
+            if start != last_start:
+                return DATE_RE.findall(line)
+            continue
+        matches.append(data[start:end].decode())
+        last_start, last_end = start, end
     return matches
 
 
 def _classify_type(line: str) -> tuple[str, list[str]]:
     lowered = line.lower()
-    matches: list[str] = []
     for item_type, keywords in TYPE_KEYWORDS.items():
         for keyword in keywords:
             if keyword in lowered:
-                matches.append(keyword)
-                return item_type, matches
-    return "other", matches
+                return item_type, [keyword]
+    return "other", []
+
+
+def _scan_scratch() -> hyperscan.Scratch:
+    # Scratch space cannot be shared between threads scanning at once.
+    scratch = getattr(_scan_local, "scratch", None)
+    if scratch is None:
+        scratch = hyperscan.Scratch(SCAN_DATABASE)
+        _scan_local.scratch = scratch
+    return scratch
 
 
 def _build_title(line: str, date_text: str, item_type: str) -> str:
     cleaned = line.replace(date_text, "").strip(" -:|\t")
-    cleaned = re.sub(r"\s{2,}", " ", cleaned).strip()
+    cleaned = _WS_RE.sub(" ", cleaned).strip()
     if cleaned:
         return cleaned
     return item_type.capitalize()
 
 
-def _confidence_score(date_text: str, keyword_hits: list[str], line: str) -> float:
+def _line_score(line: str, keyword_hits: list[str]) -> float:
     score = 0.4
     if keyword_hits:
         score += 0.3
-    if re.search(r"\d{4}", date_text):
-        score += 0.1
     if len(line) < 80:
         score += 0.05
-    if any(token in line.lower() for token in ["due", "deadline", "exam", "quiz"]):
+    if _DEADLINE_RE.search(line):
+        score += 0.1
+    return score
+
+
+def _confidence_score(date_text: str, line_score: float) -> float:
+    score = line_score
+    if _YEAR_RE.search(date_text):
         score += 0.1
     return max(0.0, min(1.0, round(score, 2)))
 
@@ -207,7 +392,7 @@ def build_calendar(events: list) -> dict:
     normalized = []
     for event in events:
         if isinstance(event, ExtractedEvent):
-            normalized.append(event.__dict__)
+            normalized.append(event.as_dict)
         elif isinstance(event, dict):
             normalized.append(event)
         else:
@@ -237,20 +422,16 @@ def calendar_to_ics(calendar: dict, title: str) -> str:
         f"DTSTAMP:{stamp}"
     ]
 
-    for event in calendar.get("events", []):
-        event_date = event["date"].replace("-", "")
-        uid = event["id"]
-        summary = _escape_ics(event["title"])
-        lines.extend(
-            [
-                "BEGIN:VEVENT",
-                f"UID:{uid}",
-                f"DTSTAMP:{stamp}",
-                f"DTSTART;VALUE=DATE:{event_date}",
-                f"SUMMARY:{summary}",
-                "END:VEVENT"
-            ]
-        )
+    # One pre-joined string per VEVENT keeps the list short.
+    lines.extend(
+        "BEGIN:VEVENT\r\n"
+        f"UID:{event['id']}\r\n"
+        f"DTSTAMP:{stamp}\r\n"
+        f"DTSTART;VALUE=DATE:{event['date'].replace('-', '')}\r\n"
+        f"SUMMARY:{_escape_ics(event['title'])}\r\n"
+        "END:VEVENT"
+        for event in calendar.get("events", [])
+    )
 
     lines.append("END:VCALENDAR")
     return "\r\n".join(lines) + "\r\n"
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from typing import Optional
 
 import os
+import threading
 
 from fastapi import FastAPI, File, Header, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
 from .db import init_db
-from .extract import build_calendar, calendar_to_ics, extract_events_from_pdf_bytes
+from .extract import build_calendar, calendar_to_ics, extract_events_from_pdf
 from .store import (
     create_task,
     delete_task,
@@ -18,10 +20,11 @@ from .store import (
     get_task,
     list_tasks,
     save_record,
+    stage_upload,
     update_task
 )
 
-app = FastAPI(title="StudyFlow Backend")
+app = FastAPI(title="StudyFlow Backend", default_response_class=ORJSONResponse)
 
 allowed_origins = [
     origin.strip()
@@ -41,6 +44,11 @@ app.add_middleware(
 )
 
 
+ICS_CACHE_SIZE = 256
+_ics_cache: OrderedDict[tuple[str, str], str] = OrderedDict()
+_ics_cache_lock = threading.Lock()
+
+
 @app.on_event("startup")
 def startup() -> None:
     init_db()
@@ -57,6 +65,29 @@ def _require_user_id(x_user_id: Optional[str]) -> str:
     return x_user_id
 
 
+def _calendar_ics(syllabus_id: str, calendar: dict, title: str) -> str:
+    # Least-recently-used eviction; a cached ICS keeps its first DTSTAMP.
+    key = (syllabus_id, title)
+    with _ics_cache_lock:
+        ics = _ics_cache.get(key)
+        if ics is not None:
+            _ics_cache.move_to_end(key)
+            return ics
+
+    ics = calendar_to_ics(calendar, title)
+    with _ics_cache_lock:
+        _ics_cache[key] = ics
+        _ics_cache.move_to_end(key)
+        while len(_ics_cache) > ICS_CACHE_SIZE:
+            _ics_cache.popitem(last=False)
+    return ics
+
+
+def _record_calendar(record: dict) -> dict:
+    # Syllabi saved before calendars were persisted have no stored copy.
+    return record.get("calendar") or build_calendar(record["events"])
+
+
 class TaskIn(BaseModel):
     title: str
     course: Optional[str] = None
@@ -142,25 +173,28 @@ def upload_syllabus(
         raise HTTPException(status_code=400, detail="Upload a PDF file.")
 
     owner_id = _require_user_id(x_user_id)
-    file_bytes = file.file.read()
-    events = extract_events_from_pdf_bytes(file_bytes)
-    calendar = build_calendar(events)
-
-    record = save_record(
-        filename=file.filename,
-        file_bytes=file_bytes,
-        events=[event.__dict__ for event in events],
-        calendar=calendar,
-        course=course,
-        user_id=owner_id
-    )
+    staged_path = stage_upload(file.file)
+    try:
+        events = extract_events_from_pdf(staged_path)
+        calendar = build_calendar(events)
+
+        record = save_record(
+            filename=file.filename,
+            staged_path=staged_path,
+            events=[event.as_dict for event in events],
+            calendar=calendar,
+            course=course,
+            user_id=owner_id
+        )
+    finally:
+        staged_path.unlink(missing_ok=True)
 
     if format == "ics":
         calendar_title = course or "Syllabus Calendar"
-        ics = calendar_to_ics(calendar, calendar_title)
+        ics = _calendar_ics(record["id"], calendar, calendar_title)
         return PlainTextResponse(content=ics, media_type="text/calendar")
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=201,
         content={
             "syllabus_id": record["id"],
@@ -180,8 +214,7 @@ def get_syllabus(
     record = get_record(syllabus_id, user_id=_require_user_id(x_user_id))
     if not record:
         raise HTTPException(status_code=404, detail="Syllabus not found.")
-    calendar = build_calendar(record["events"])
-    return {**record, "calendar": calendar}
+    return {**record, "calendar": _record_calendar(record)}
 
 
 @app.get("/api/syllabi/{syllabus_id}/calendar")
@@ -194,10 +227,10 @@ def get_calendar(
     if not record:
         raise HTTPException(status_code=404, detail="Syllabus not found.")
 
-    calendar = build_calendar(record["events"])
+    calendar = _record_calendar(record)
     if format == "ics":
         calendar_title = record.get("course") or "Syllabus Calendar"
-        ics = calendar_to_ics(calendar, calendar_title)
+        ics = _calendar_ics(syllabus_id, calendar, calendar_title)
         return PlainTextResponse(content=ics, media_type="text/calendar")
 
     return {"calendar": calendar}
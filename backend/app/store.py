@@ -1,51 +1,82 @@
 from __future__ import annotations
 
 from datetime import datetime
+import json
 from pathlib import Path
-from typing import Optional
+import shutil
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Optional
 from uuid import uuid4
 
-from .db import get_connection, init_db
+from .db import get_connection, transaction
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 STORE_DIR = BASE_DIR / "storage"
 
+TASK_UPDATE_FIELDS = (
+    "title",
+    "course",
+    "description",
+    "task_type",
+    "due_date",
+    "estimated_minutes",
+    "importance",
+    "status"
+)
+
+# One fixed statement for every update shape so SQLite reuses its cached
+# plan; each column takes an "is set" flag so explicit nulls still clear it.
+UPDATE_TASK_SQL = (
+    "UPDATE tasks SET "
+    + ", ".join(f"{field} = CASE WHEN ? THEN ? ELSE {field} END" for field in TASK_UPDATE_FIELDS)
+    + " WHERE id = ? AND user_id = ? RETURNING *"
+)
+
+
+def stage_upload(file_obj: BinaryIO) -> Path:
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(dir=STORE_DIR, prefix="upload_", suffix=".pdf", delete=False) as staged:
+        shutil.copyfileobj(file_obj, staged)
+    return Path(staged.name)
+
 
 def save_record(
     filename: str,
-    file_bytes: bytes,
+    staged_path: Path,
     events: list[dict],
     calendar: dict,
     course: Optional[str] = None,
     user_id: Optional[str] = None
 ) -> dict:
-    init_db()
     owner_id = user_id or "local"
     syllabus_id = f"syl_{uuid4().hex[:12]}"
     file_path = STORE_DIR / f"{syllabus_id}.pdf"
-    file_path.write_bytes(file_bytes)
+    staged_path.replace(file_path)
 
     created_at = datetime.utcnow().isoformat()
-    with get_connection() as connection:
+    with transaction() as connection:
         connection.execute(
-            "INSERT INTO syllabi (id, user_id, file_name, course, created_at) VALUES (?, ?, ?, ?, ?)",
-            (syllabus_id, owner_id, filename, course, created_at)
+            """
+            INSERT INTO syllabi (id, user_id, file_name, course, created_at, calendar_json)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (syllabus_id, owner_id, filename, course, created_at, json.dumps(calendar))
         )
-        for event in events:
-            connection.execute(
-                """
-                INSERT INTO syllabus_events (
-                    syllabus_id,
-                    event_uid,
-                    title,
-                    event_date,
-                    event_type,
-                    confidence,
-                    source_page,
-                    source_line
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        connection.executemany(
+            """
+            INSERT INTO syllabus_events (
+                syllabus_id,
+                event_uid,
+                title,
+                event_date,
+                event_type,
+                confidence,
+                source_page,
+                source_line
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
                 (
                     syllabus_id,
                     event.get("id"),
@@ -56,7 +87,9 @@ def save_record(
                     event.get("source_page"),
                     event.get("source_line")
                 )
-            )
+                for event in events
+            ]
+        )
 
     return {
         "id": syllabus_id,
@@ -70,20 +103,19 @@ def save_record(
 
 
 def get_record(syllabus_id: str, user_id: Optional[str] = None) -> Optional[dict]:
-    init_db()
     owner_id = user_id or "local"
-    with get_connection() as connection:
-        syllabus = connection.execute(
-            "SELECT * FROM syllabi WHERE id = ? AND user_id = ?",
-            (syllabus_id, owner_id)
-        ).fetchone()
-        if not syllabus:
-            return None
-
-        event_rows = connection.execute(
-            "SELECT * FROM syllabus_events WHERE syllabus_id = ? ORDER BY event_date",
-            (syllabus_id,)
-        ).fetchall()
+    connection = get_connection()
+    syllabus = connection.execute(
+        "SELECT * FROM syllabi WHERE id = ? AND user_id = ?",
+        (syllabus_id, owner_id)
+    ).fetchone()
+    if not syllabus:
+        return None
+
+    event_rows = connection.execute(
+        "SELECT * FROM syllabus_events WHERE syllabus_id = ? ORDER BY event_date",
+        (syllabus_id,)
+    ).fetchall()
 
     events = [
         {
@@ -104,38 +136,39 @@ def get_record(syllabus_id: str, user_id: Optional[str] = None) -> Optional[dict
         "file_name": syllabus["file_name"],
         "course": syllabus["course"],
         "created_at": syllabus["created_at"],
-        "events": events
+        "events": events,
+        "calendar": json.loads(syllabus["calendar_json"]) if syllabus["calendar_json"] else None
     }
 
 
 def list_tasks(user_id: Optional[str] = None) -> list[dict]:
-    init_db()
     owner_id = user_id or "local"
-    with get_connection() as connection:
-        rows = connection.execute(
-            "SELECT * FROM tasks WHERE user_id = ? ORDER BY due_date",
-            (owner_id,)
-        ).fetchall()
-    return [dict(row) for row in rows]
+    # Plain tuples zipped with one column list skip sqlite3.Row's per-row
+    # key lookups when building the dicts.
+    cursor = get_connection().cursor()
+    cursor.row_factory = None
+    cursor.execute(
+        "SELECT * FROM tasks WHERE user_id = ? ORDER BY due_date",
+        (owner_id,)
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 
 def get_task(task_id: int, user_id: Optional[str] = None) -> Optional[dict]:
-    init_db()
     owner_id = user_id or "local"
-    with get_connection() as connection:
-        row = connection.execute(
-            "SELECT * FROM tasks WHERE id = ? AND user_id = ?",
-            (task_id, owner_id)
-        ).fetchone()
+    row = get_connection().execute(
+        "SELECT * FROM tasks WHERE id = ? AND user_id = ?",
+        (task_id, owner_id)
+    ).fetchone()
     return dict(row) if row else None
 
 
 def create_task(data: dict, user_id: Optional[str] = None) -> dict:
-    init_db()
     owner_id = user_id or "local"
     created_at = datetime.utcnow().isoformat()
-    with get_connection() as connection:
-        cursor = connection.execute(
+    with transaction() as connection:
+        row = connection.execute(
             """
             INSERT INTO tasks (
                 user_id,
@@ -150,6 +183,7 @@ def create_task(data: dict, user_id: Optional[str] = None) -> dict:
                 created_at
             )
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
             (
                 owner_id,
@@ -163,60 +197,32 @@ def create_task(data: dict, user_id: Optional[str] = None) -> dict:
                 data.get("status", "pending"),
                 created_at
             )
-        )
-        task_id = cursor.lastrowid
+        ).fetchone()
 
-    task = get_task(task_id, owner_id)
-    return task or {
-        "id": task_id,
-        "user_id": owner_id,
-        "title": data.get("title"),
-        "course": data.get("course"),
-        "description": data.get("description"),
-        "task_type": data.get("task_type"),
-        "due_date": data.get("due_date"),
-        "estimated_minutes": data.get("estimated_minutes"),
-        "importance": data.get("importance"),
-        "status": data.get("status", "pending"),
-        "created_at": created_at
-    }
+    return dict(row)
 
 
 def update_task(task_id: int, updates: dict, user_id: Optional[str] = None) -> Optional[dict]:
-    init_db()
     owner_id = user_id or "local"
-    allowed_fields = {
-        "title",
-        "course",
-        "description",
-        "task_type",
-        "due_date",
-        "estimated_minutes",
-        "importance",
-        "status"
-    }
-    set_items = [(key, value) for key, value in updates.items() if key in allowed_fields]
-    if not set_items:
+    if not any(key in updates for key in TASK_UPDATE_FIELDS):
         return get_task(task_id, owner_id)
 
-    set_clause = ", ".join([f"{key} = ?" for key, _ in set_items])
-    values = [value for _, value in set_items]
+    values: list = []
+    for key in TASK_UPDATE_FIELDS:
+        values.append(key in updates)
+        values.append(updates.get(key))
     values.append(task_id)
     values.append(owner_id)
 
-    with get_connection() as connection:
-        connection.execute(
-            f"UPDATE tasks SET {set_clause} WHERE id = ? AND user_id = ?",
-            values
-        )
+    with transaction() as connection:
+        row = connection.execute(UPDATE_TASK_SQL, values).fetchone()
 
-    return get_task(task_id, owner_id)
+    return dict(row) if row else None
 
 
 def delete_task(task_id: int, user_id: Optional[str] = None) -> bool:
-    init_db()
     owner_id = user_id or "local"
-    with get_connection() as connection:
+    with transaction() as connection:
         cursor = connection.execute(
             "DELETE FROM tasks WHERE id = ? AND user_id = ?",
             (task_id, owner_id)